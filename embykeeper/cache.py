@@ -33,6 +33,11 @@ class Cache:
             except json.JSONDecodeError:
                 logger.warning("缓存文件损坏, 将使用全新缓存.")
 
+    def _save(self) -> None:
+        """将缓存以紧凑格式写入 JSON 文件."""
+        with open(self._cache_file, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, separators=(",", ":"))
+
     def get(self, key: str, default: Any = None) -> Any:
         if self._mongo_client:
             result = self._collection.find_one({"_id": key})
@@ -55,8 +60,7 @@ class Cache:
             for part in parts[:-1]:
                 current = current.setdefault(part, {})
             current[parts[-1]] = value
-            with open(self._cache_file, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, ensure_ascii=False)
+            self._save()
 
     def delete(self, key: str) -> None:
         if self._mongo_client:
@@ -84,8 +88,7 @@ class Cache:
                     else:
                         break
 
-            with open(self._cache_file, "w", encoding="utf-8") as f:
-                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            self._save()
 
     def find_by_prefix(self, prefix: str) -> List[str]:
         if self._mongo_client:
@@ -150,8 +153,7 @@ class Cache:
 
             # 只在有改动时写入一次文件
             if changed:
-                with open(self._cache_file, "w", encoding="utf-8") as f:
-                    json.dump(self._data, f, ensure_ascii=False, indent=2)
+                self._save()
 
 
 cache: Cache = CachedFuncProxy(lambda: Cache())
@@ -1,10 +1,13 @@
 import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime
+import json
 import random
 import string
-from urllib.parse import quote
+from urllib.parse import parse_qsl, quote, urlencode, urlparse
 import uuid
-from typing import Iterable, List, Union, Optional
+from typing import Dict, Iterable, List, Tuple, Union, Optional
 import re
 
 from loguru import logger
@@ -17,8 +20,23 @@ from embykeeper.cache import cache
 from embykeeper.schema import EmbyAccount
 from embykeeper.config import config
 
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
 logger = logger.bind(scheme="embywatcher")
 
+# 进程内的登陆凭据缓存, 键为 (站点域名, 用户名)
+_credentials: Dict[Tuple[str, str], dict] = {}
+
 
 class EmbyError(Exception):
     pass
@@ -52,6 +70,74 @@ class EmbyEnv(BaseModel):
     useragent: str
 
 
+class _PooledSession:
+    """在多个 Emby 实例间共享的 HTTP 会话, 带引用计数, 空闲超过 `timeout` 秒后自动关闭."""
+
+    def __init__(self, timeout: float = 60):
+        self.timeout = timeout
+        self.session: Optional[AsyncSession] = None
+        self.lock = asyncio.Lock()
+        self.uses = 0
+        self.idle = asyncio.Event()
+        self.busy = asyncio.Event()
+        self.reaper: Optional[asyncio.Task] = None
+        self.closing: Optional[asyncio.Future] = None
+
+    async def acquire(self) -> AsyncSession:
+        """获取或创建 HTTP 会话, 并增加其引用计数."""
+        async with self.lock:
+            if not self.session:
+                self.session = AsyncSession(
+                    verify=False,
+                    timeout=10.0,
+                    impersonate="chrome",
+                    allow_redirects=True,
+                    default_headers=False,
+                )
+                self.reaper = asyncio.create_task(self._reap())
+                self.reaper.add_done_callback(self._reaped)
+            self.uses += 1
+            self.idle.clear()
+            self.busy.set()
+            return self.session
+
+    def release(self):
+        """减少 HTTP 会话的引用计数, 归零时通知回收任务."""
+        self.uses -= 1
+        if not self.uses:
+            self.busy.clear()
+            self.idle.set()
+
+    async def _reap(self):
+        while True:
+            await self.idle.wait()
+            try:
+                await asyncio.wait_for(self.busy.wait(), self.timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            async with self.lock:
+                if self.uses:
+                    continue
+                session, self.session = self.session, None
+                self.reaper = None
+            await session.close()
+            return
+
+    def _reaped(self, task: asyncio.Task):
+        # 回收任务被取消时 (例如程序退出, 可能尚未开始运行), 关闭其仍持有的会话
+        if task is not self.reaper or not task.cancelled():
+            return
+        self.reaper = None
+        if self.session:
+            session, self.session = self.session, None
+            self.closing = asyncio.ensure_future(session.close())
+
+
+# 进程内共享的 HTTP 会话, 键为 (站点域名, 用户名)
+_sessions: Dict[Tuple[str, str], _PooledSession] = {}
+
+
 class Emby:
     playing_count = 0
 
@@ -61,11 +147,14 @@ class Emby:
         self._env = None
         self._token = None
         self._user_id = None
+        self._auth_header = None
+        self._auth_header_token = None
 
         self.run_id = str(uuid.uuid4()).upper()
         self.cf_clearance = None
         self.useragent = None
         self.items = {}
+        self._pooled: Optional[_PooledSession] = None
 
         self.log = logger.bind(server=self.a.name or self.hostname, username=self.a.username)
 
@@ -98,7 +187,11 @@ class Emby:
         return self._user_id
 
     def _load_credentials(self):
-        data: dict = cache.get(f"emby.credential.{self.hostname}.{self.a.username}", {})
+        key = (self.hostname, self.a.username)
+        data = _credentials.get(key, None)
+        if data is None:
+            data = cache.get(f"emby.credential.{self.hostname}.{self.a.username}", {})
+            _credentials[key] = data
         self._token = data.get("token", None)
         self._user_id = data.get("userid", None)
 
@@ -209,75 +302,144 @@ class Emby:
         cache.set(f"emby.env.{self.hostname}.{self.a.username}", data)
         return env
 
+    def get_auth_header(self):
+        """获取 X-Emby-Authorization 头, 仅在令牌变化时重新生成."""
+        token = self.token or ""
+        if self._auth_header is None or self._auth_header_token != token:
+            auth_headers = {
+                "Client": self.env.client,
+                "Device": self.env.device,
+                "DeviceId": self.env.device_id,
+                "Version": self.env.client_version,
+            }
+            auth_header = ",".join([f"{k}={quote(str(v))}" for k, v in auth_headers.items()])
+            self._auth_header = f"MediaBrowser Token={token},Emby UserId={self.run_id},{auth_header}"
+            self._auth_header_token = token
+        return self._auth_header
+
     def build_headers(self):
         headers = {}
-        auth_headers = {
-            "Client": self.env.client,
-            "Device": self.env.device,
-            "DeviceId": self.env.device_id,
-            "Version": self.env.client_version,
-        }
-        auth_header = ",".join([f"{k}={quote(str(v))}" for k, v in auth_headers.items()])
-        full_auth_header = f'MediaBrowser Token={self.token or ""},Emby UserId={self.run_id},{auth_header}'
         headers["User-Agent"] = self.useragent or self.env.useragent
         headers["Accept-Language"] = "zh-CN,zh-Hans;q=0.9"
         headers["Content-Type"] = "application/json"
         headers["Accept"] = "*/*"
-        headers["X-Emby-Authorization"] = full_auth_header
+        headers["X-Emby-Authorization"] = self.get_auth_header()
         if self.token:
             headers["X-Emby-Token"] = self.token
         return headers
 
-    def _get_session(self) -> AsyncSession:
-        cookies = {}
-        if self.cf_clearance:
-            cookies["cf_clearance"] = self.cf_clearance
-
-        return AsyncSession(
-            verify=False,
-            headers=self.build_headers(),
-            cookies=cookies,
-            proxy=get_proxy_str(self.proxy, curl=True),
-            timeout=10.0,
-            impersonate="chrome",
-            allow_redirects=True,
-            default_headers=False,
-        )
+    @asynccontextmanager
+    async def _use_session(self):
+        """使用该账户共享的 HTTP 会话."""
+        pooled = self._pooled
+        if not pooled:
+            key = (self.hostname, self.a.username)
+            pooled = _sessions.get(key, None)
+            if not pooled:
+                pooled = _sessions[key] = _PooledSession()
+            self._pooled = pooled
+        session = await pooled.acquire()
+        try:
+            yield session
+        finally:
+            pooled.release()
 
-    async def _request(self, method: str, path: str, _login=False, **kw) -> Response:
+    @asynccontextmanager
+    async def _stream(self, method: str, path: str, **kw):
+        """发送流式请求, 在响应关闭前保持对 HTTP 会话的占用."""
+        async with self._use_session():
+            resp = await self._request(method, path, stream=True, **kw)
+            try:
+                yield resp
+            finally:
+                await resp.aclose()
+
+    @staticmethod
+    def _backoff(attempt: int, base_delay: float = 0.5, cap: float = 30.0) -> float:
+        """计算第 `attempt` 次重试前的等待时间 (截断指数退避 + 完全抖动)."""
+        return random.uniform(0, min(cap, base_delay * (2**attempt)))
 
+    def _build_url(self, path: str, params: Optional[dict] = None) -> str:
+        """构造请求 URL, 查询参数在此一次性编码, 与 curl_cffi 的合并规则相同, 值为 None 的参数将被忽略."""
         if path.startswith(("http://", "https://")):
             url = path
         else:
-            base_url = f"{self.a.url.scheme}://{self.a.url.host}:{self.a.url.port}"
-            url = f"{base_url}/{path.lstrip('/')}"
+            url = f"{self.a.url.scheme}://{self.a.url.host}:{self.a.url.port}/{path.lstrip('/')}"
+        if params:
+            parsed = urlparse(url)
+            args = parse_qsl(parsed.query, keep_blank_values=True)
+            counts = Counter(k for k, _ in args)
+            for key, value in params.items():
+                if value is None:
+                    continue
+                if isinstance(value, (bool, dict)):
+                    value = json.dumps(value)
+                if counts.get(key) == 1:
+                    # URL 中已有唯一的同名参数时将其替换
+                    args = [(k, value) if k == key else (k, v) for k, v in args]
+                else:
+                    args.append((key, value))
+            url = parsed._replace(query=urlencode(args, doseq=True)).geturl()
+        return url
 
+    async def _request(self, method: str, path: str, _login=False, **kw) -> Response:
+        url = self._build_url(path, kw.pop("params", None))
+
+        if "json" in kw:
+            # 预先序列化请求体, 避免每次重试重复序列化
+            kw["data"] = _dumps(kw.pop("json"))
+
+        extra_headers = kw.pop("headers", None)
+
+        tries = 3
+        attempt = 0
+        relogin = False
         last_err = None
-        for _ in range(3):
+        while attempt < tries:
             try:
-                async with self._get_session() as session:
-                    resp: Response = await session.request(method, url, **kw)
-                    if resp.status_code == 401 and self.a.username and not _login:
+                headers = self.build_headers()
+                if extra_headers:
+                    headers.update(extra_headers)
+                cookies = {"cf_clearance": self.cf_clearance} if self.cf_clearance else None
+                async with self._use_session() as session:
+                    resp: Response = await session.request(
+                        method,
+                        url,
+                        headers=headers,
+                        cookies=cookies,
+                        proxy=get_proxy_str(self.proxy, curl=True),
+                        **kw,
+                    )
+                    if resp.status_code == 401 and self.a.username and not _login and not relogin:
+                        # 重新登陆不占用重试次数, 但仅尝试一次
                         if not await self.login():
                             raise EmbyLoginError("无法登陆到服务器")
+                        relogin = True
                         continue
                     elif resp.status_code in (502, 503, 504):
-                        await asyncio.sleep(random.random() * 2 + 0.5)
+                        attempt += 1
+                        if attempt < tries:
+                            await asyncio.sleep(self._backoff(attempt))
                         continue
                     elif resp.status_code == 403 and (
-                        "cf-wrapper" in resp.text or "Just a moment" in resp.text
+                        b"cf-wrapper" in resp.content or b"Just a moment" in resp.content
                     ):
                         if self.cf_clearance:
                             raise EmbyStatusError("访问失败: Cloudflare 验证码解析后依然有验证")
                         await self.use_cfsolver()
+                        attempt += 1
                         continue
                     elif not resp.ok and not _login:
-                        raise EmbyStatusError(f"访问失败: 异常 HTTP 代码 {resp.status_code} (URL = {url})")
+                        raise EmbyStatusError(
+                            f"访问失败: 异常 HTTP 代码 {resp.status_code} (URL = {url}): {resp.content[:256]!r}"
+                        )
                     else:
                         return resp
             except RequestsError as e:
                 last_err = e
-                await asyncio.sleep(random.random() + 0.5)
+                attempt += 1
+                if attempt < tries:
+                    await asyncio.sleep(self._backoff(attempt))
 
         if last_err:
             error_msg = re.sub(r"\s+See\s+.*?\s+first for more details\.\.?", "", str(last_err))
@@ -285,6 +447,31 @@ class Emby:
         else:
             raise EmbyConnectError(f'连接到 "{url}" 重试超限')
 
+    @staticmethod
+    def _check_status(resp: Response):
+        """在解析前检查响应状态 (非 2xx 响应通常已在 `_request` 中报错, 此处为防御性检查)."""
+        if not 200 <= resp.status_code < 300:
+            raise EmbyStatusError(f"访问失败: 异常 HTTP 代码 {resp.status_code}: {resp.content[:256]!r}")
+
+    @classmethod
+    def resp_to_json(cls, resp: Response):
+        """将响应解析为 JSON 对象."""
+        cls._check_status(resp)
+        try:
+            return _loads(resp.content)
+        except ValueError as e:
+            raise EmbyRequestError(f"无法解析服务器响应 (HTTP {resp.status_code}): {e}") from None
+
+    @classmethod
+    def resp_to_items(cls, resp: Response, prefix: str = "Items.item", limit: int = None) -> List[dict]:
+        """从响应中解析至多 `limit` 个项目, `prefix` 为以 "." 分隔的项目列表路径, 以 "item" 结尾."""
+        data = cls.resp_to_json(resp)
+        for key in prefix.split(".")[:-1]:
+            data = data.get(key, []) if isinstance(data, dict) else []
+        if not isinstance(data, list):
+            return []
+        return data[:limit]
+
     async def use_cfsolver(self):
         from embykeeper.cloudflare import get_cf_clearance
 
@@ -352,7 +539,7 @@ class Emby:
             self.log.warning(f"登陆时出现错误 ({resp.status_code}), 执行失败.")
             return None
 
-        user: dict = resp.json()
+        user: dict = self.resp_to_json(resp)
         self._token = user.get("AccessToken", None)
         self._user_id = user.get("User", {}).get("Id")
         if self.token and self.user_id:
@@ -360,6 +547,7 @@ class Emby:
                 "token": self.token,
                 "userid": self.user_id,
             }
+            _credentials[(self.hostname, self.a.username)] = cache_data
             cache.set(f"emby.credential.{self.hostname}.{self.a.username}", cache_data)
             return self.token
 
@@ -504,7 +692,7 @@ class Emby:
             ),
             json=playback_info_data,
         )
-        playback_info = resp.json()
+        playback_info = self.resp_to_json(resp)
 
         play_session_id = playback_info.get("PlaySessionId", "")
         if "MediaSources" in playback_info:
@@ -576,30 +764,28 @@ class Emby:
             )
             return data
 
-        async def stream():
+        async def stream(rate: int = 1024):
+            """以约 `rate` 字节每秒的速度读取流媒体文件, 直到任务被取消."""
             url = direct_stream_url or f"/Videos/{iid}/stream"
             length = 0
             last_err_time = datetime.now()
             while True:
-                resp = await self._request(
-                    method="GET",
-                    path=url,
-                    stream=True,
-                    max_recv_speed=1024,
-                    timeout=None,
-                    headers={
-                        "Range": f"bytes={length}-",
-                        "User-Agent": "VLC/3.0.21 LibVLC/3.0.21",
-                        "X-Playback-Session-Id": play_session_id,
-                    },
-                )
                 try:
-                    async for i in resp.aiter_content(chunk_size=1024):
-                        length += len(i)
-                        del i
-                        await asyncio.sleep(random.random())
-                        if random.random() < 0.01:
-                            continue
+                    async with self._stream(
+                        method="GET",
+                        path=url,
+                        max_recv_speed=rate,
+                        timeout=None,
+                        headers={
+                            "Range": f"bytes={length}-",
+                            "User-Agent": "VLC/3.0.21 LibVLC/3.0.21",
+                            "X-Playback-Session-Id": play_session_id,
+                        },
+                    ) as resp:
+                        # 读取速率由 curl 的 max_recv_speed 限制, 无需在此等待
+                        async for i in resp.aiter_content():
+                            length += len(i)
+                            del i
                 except RequestsError:
                     if (datetime.now() - last_err_time).total_seconds() > 5:
                         self.log.debug("流媒体文件访问错误, 正在重试.")
@@ -607,11 +793,9 @@ class Emby:
                         continue
                     else:
                         raise
-                finally:
-                    await resp.aclose()
 
-        stream_task = asyncio.create_task(stream())
         rt = random.uniform(5, 10)
+        stream_task = asyncio.create_task(stream())
         self.log.info(f'开始模拟加载视频 "{truncate_str(iname, 10)}" ({rt:.0f} 秒).')
         await asyncio.sleep(rt)
         self.log.info(f'开始发送视频 "{truncate_str(iname, 10)}" 发送进度.')
@@ -694,7 +878,7 @@ class Emby:
         )
 
         col_ids = []
-        for i in views.json().get("Items", []):
+        for i in self.resp_to_json(views).get("Items", []):
             cid: str = i.get("Id", None)
             type: str = i.get("CollectionType")
             if cid and type and type.lower() in ("movies", "tvshows"):
@@ -702,7 +886,7 @@ class Emby:
         await asyncio.sleep(random.uniform(0.1, 0.3))
 
         user = await self._request(method="GET", path=f"/Users/{self.user_id}")
-        last_login_date = user.json().get("LastLoginDate", None)
+        last_login_date = self.resp_to_json(user).get("LastLoginDate", None)
         await asyncio.sleep(random.uniform(0.1, 0.3))
 
         await self._request(
@@ -776,7 +960,7 @@ class Emby:
                 **kw,
             },
         )
-        return resp.json()
+        return self.resp_to_items(resp, prefix="item", limit=limit)
 
     async def get_resume_items(
         self,
@@ -804,7 +988,7 @@ class Emby:
                 **kw,
             },
         )
-        return resp.json()
+        return self.resp_to_json(resp)
 
     async def get_folder_items(
         self,
@@ -835,16 +1019,16 @@ class Emby:
                 **kw,
             },
         )
-        return resp.json().get("Items", [])
+        return self.resp_to_items(resp, limit=limit)
 
     async def get_item(self, iid, **kw) -> dict:
         resp = await self._request(method="GET", path=f"/Users/{self.user_id}/Items/{iid}")
-        return resp.json()
+        return self.resp_to_json(resp)
 
     async def get_user(self) -> dict:
         """Get current user information."""
         response = await self._request("GET", f"/Users/{self.user_id}")
-        return response.json()
+        return self.resp_to_json(response)
 
     async def mark_played(self, item_id: str) -> bool:
         """Mark an item as played."""
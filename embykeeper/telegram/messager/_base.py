@@ -1,14 +1,16 @@
 import asyncio
+from functools import lru_cache
+import heapq
+import itertools
 import random
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime, time, timedelta
 from pathlib import Path
-from typing import Iterable, List, Literal, Optional, Union
+from time import time as unix_time
+from typing import Iterable, List, Literal, Optional, Tuple, Union
 from cachetools import LRUCache
 
-import yaml
-from dateutil import parser
 from loguru import logger
 from pyrogram.types import User
 from pyrogram.enums import ChatMemberStatus
@@ -29,6 +31,8 @@ from ..link import Link
 
 __ignore__ = True
 
+_MULTIPLY_RE = re.compile(r"(.*)\*\s?(\d+)")  # 话术列表资源名后的重复次数, 例如 "some-wl@v1.yaml * 1000"
+
 
 @dataclass(eq=False)
 class _MessageSchedule:
@@ -70,6 +74,10 @@ class MessagePlan:
     at: datetime
     schedule: _MessageSchedule
     skip: bool = False
+    at_ts: float = field(init=False)  # 发送时间的时间戳, 用于排序与计算等待时间
+
+    def __post_init__(self):
+        self.at_ts = self.at.timestamp()
 
 
 class MessageMaterialSchema(BaseModel):
@@ -81,6 +89,27 @@ class MessageMaterialSchema(BaseModel):
     only: Optional[str] = Field(default=None)
 
 
+@lru_cache(maxsize=256)
+def _parse_time(t: str) -> time:
+    """解析时间字符串, 常见的 "H:M" 格式不经过 dateutil."""
+    try:
+        return datetime.strptime(t, "%H:%M").time()
+    except ValueError:
+        from dateutil import parser
+
+        return parser.parse(t).time()
+
+
+@lru_cache(maxsize=64)
+def _load_material(file: str, mtime: float) -> MessageMaterialSchema:
+    """读取并校验话术文件, 以文件路径和修改时间为键缓存."""
+    import yaml
+
+    with open(file, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    return MessageMaterialSchema.model_validate(data)
+
+
 class Messager:
     """自动水群类."""
 
@@ -127,18 +156,18 @@ class Messager:
         self.possibility = config.get("possibility", self.possibility)
         self.only = config.get("only", self.only)
         self.log = logger.bind(scheme="telemessager", name=self.name, username=me.full_name)
-        self.timeline: List[MessagePlan] = []
+        self.timeline: List[Tuple[float, int, MessagePlan]] = []  # 以发送时间为键的最小堆
+        self._timeline_seq = itertools.count()
+        self._valid_timeline: List[Tuple[float, int, MessagePlan]] = []  # 仅包含有效计划的最小堆
 
     def parse_message_yaml(self, file):
         """解析话术文件."""
-        with open(file, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-
-        material = MessageMaterialSchema.model_validate(data)
+        file = Path(file)
+        material = _load_material(str(file), file.stat().st_mtime)
 
         at = self.at or material.at
         assert len(at) == 2
-        at = [parser.parse(t).time() for t in at]
+        at = [_parse_time(t) for t in at]
 
         possibility = self.possibility or material.possibility
         only = self.only or material.only
@@ -150,21 +179,23 @@ class Messager:
             only=only,
         )
 
-    def add(self, schedule: _MessageSchedule, use_multiply=False):
-        """根据规划, 生成计划, 并增加到时间线."""
+    def add(self, schedule: _MessageSchedule, use_multiply=False, day: date = None):
+        """根据规划, 生成某日 (默认为今日) 的计划, 并增加到时间线, 已过去的计划将被忽略."""
         start_time, end_time = schedule.at
         if isinstance(start_time, str):
-            start_time = parser.parse(start_time).time()
+            start_time = _parse_time(start_time)
         if isinstance(end_time, str):
-            end_time = parser.parse(end_time).time()
-        start_datetime = datetime.combine(date.today(), start_time or time(0, 0))
-        end_datetime = datetime.combine(date.today(), end_time or time(23, 59, 59))
+            end_time = _parse_time(end_time)
+        now = datetime.now()
+        day = day or now.date()
+        start_datetime = datetime.combine(day, start_time or time(0, 0))
+        end_datetime = datetime.combine(day, end_time or time(23, 59, 59))
         if end_datetime < start_datetime:
             end_datetime += timedelta(days=1)
         start_timestamp = start_datetime.timestamp()
         end_timestamp = end_datetime.timestamp()
         num_plans = schedule.multiply if use_multiply else 1
-        base = [mp.at.timestamp() for mp in self.timeline]
+        base = [ts for ts, _, _ in self.timeline]
         timestamps = distribute_numbers(
             start_timestamp, end_timestamp, num_plans, self.min_interval, self.max_interval, base=base
         )
@@ -172,40 +203,56 @@ class Messager:
         ignored = num_plans - len(timestamps)
         if ignored:
             self.log.warning(f"发生错误: 部分发送计划 ({ignored}) 无法排入当日日程并被跳过, 请检查您的配置.")
-            for _ in range(ignored):
-                mps.append(
-                    MessagePlan(
-                        message=random.choice(schedule.messages),
-                        at=end_datetime,
-                        schedule=schedule,
-                        skip=True,
-                    )
-                )
-        for t in timestamps:
+        messages = schedule.messages
+        if len(timestamps) > 16:
+            # 计划较多时, 使用 numpy 一次性生成所有随机数
+            import numpy as np
+
+            rng = np.random.default_rng()
+            picks = rng.integers(0, len(messages), size=len(timestamps)).tolist()
+            rolls = rng.random(size=len(timestamps)).tolist()
+        else:
+            picks = [random.randrange(len(messages)) for _ in timestamps]
+            rolls = [random.random() for _ in timestamps]
+        for t, pick, roll in zip(timestamps, picks, rolls):
             at = datetime.fromtimestamp(t)
-            if at < datetime.now():
-                at += timedelta(days=1)
+            if at < now:
+                continue
             skip = False
-            if random.random() >= schedule.possibility:
+            if roll >= schedule.possibility:
                 skip = True
             elif schedule.only:
-                today = datetime.today()
-                if schedule.only.startswith("weekday") and today.weekday() > 4:
+                if schedule.only.startswith("weekday") and day.weekday() > 4:
                     skip = True
-                if schedule.only.startswith("weekend") and today.weekday() < 5:
+                if schedule.only.startswith("weekend") and day.weekday() < 5:
                     skip = True
             mps.append(
                 MessagePlan(
-                    message=random.choice(schedule.messages),
+                    message=messages[pick],
                     at=at,
                     schedule=schedule,
                     skip=skip,
                 )
             )
-        self.timeline.extend(mps)
-        self.timeline = sorted(self.timeline, key=lambda x: x.at)
+        for mp in mps:
+            self.push(mp)
         return True
 
+    def push(self, plan: MessagePlan):
+        """将计划加入时间线."""
+        entry = (plan.at_ts, next(self._timeline_seq), plan)
+        heapq.heappush(self.timeline, entry)
+        if not plan.skip:
+            heapq.heappush(self._valid_timeline, entry)
+
+    def pop(self) -> MessagePlan:
+        """从时间线中取出最早的计划."""
+        _, _, plan = heapq.heappop(self.timeline)
+        if not plan.skip:
+            # 有效计划堆中的键与时间线相同, 因此其堆顶即为该计划
+            heapq.heappop(self._valid_timeline)
+        return plan
+
     async def get_spec_path(self, spec):
         """下载话术文件对应的本地或云端文件."""
         if not Path(spec).exists():
@@ -215,6 +262,8 @@ class Messager:
 
     async def get_spec_schedule(self, spec_or_schedule):
         """解析话术文件对应的本地或云端文件."""
+        import yaml
+
         if isinstance(spec_or_schedule, MessageSchedule):
             if spec_or_schedule.spec:
                 file = await self.get_spec_path(spec_or_schedule.spec)
@@ -291,7 +340,7 @@ class Messager:
                 if schedule:
                     schedules.append(schedule)
             else:
-                match = re.match(r"(.*)\*\s?(\d+)", m)
+                match = _MULTIPLY_RE.match(m)
                 if match:
                     multiply = int(match.group(2))
                     spec = match.group(1).strip()
@@ -307,20 +356,29 @@ class Messager:
         self.log.info(f"共启用 {len(schedules)} 个消息规划, 发送 {nmsgs} 条消息.")
         for s in schedules:
             self.add(s, use_multiply=True)
+        # 每日零点一次性生成次日的全部计划
+        rebuild_at = datetime.combine(date.today() + timedelta(days=1), time(0, 0))
 
         self.ctx.status = RunStatus.RUNNING
-        if self.timeline:
+        if schedules:
             last_valid_p = None
             while True:
-                valid_p = [p for p in self.timeline if not p.skip]
-                self.log.debug(f"时间线上当前有 {len(self.timeline)} 个消息计划, {len(valid_p)} 个有效.")
+                if not self.timeline or self.timeline[0][0] >= rebuild_at.timestamp():
+                    await asyncio.sleep(rebuild_at.timestamp() - unix_time())
+                    for s in schedules:
+                        self.add(s, use_multiply=True, day=rebuild_at.date())
+                    rebuild_at += timedelta(days=1)
+                    continue
+                self.log.debug(
+                    f"时间线上当前有 {len(self.timeline)} 个消息计划, {len(self._valid_timeline)} 个有效."
+                )
                 if debug > 1:
                     self.log.debug(
                         "时间序列: "
-                        + " ".join([p.at.strftime("%d%H%M%S") for p in sorted(valid_p, key=lambda x: x.at)])
+                        + " ".join([p.at.strftime("%d%H%M%S") for _, _, p in sorted(self._valid_timeline)])
                     )
-                if valid_p:
-                    next_valid_p = min(valid_p, key=lambda x: x.at)
+                if self._valid_timeline:
+                    _, _, next_valid_p = self._valid_timeline[0]
                     if not next_valid_p == last_valid_p:
                         last_valid_p = next_valid_p
                         self.log.info(
@@ -328,15 +386,14 @@ class Messager:
                         )
                 else:
                     self.log.info(f"下一次发送被跳过.")
-                next_p = min(self.timeline, key=lambda x: x.at)
+                _, _, next_p = self.timeline[0]
                 self.log.debug(
                     f"下一次计划任务将在 [blue]{next_p.at.strftime('%m-%d %H:%M:%S')}[/] 进行 ({'跳过' if next_p.skip else '有效'})."
                 )
-                await asyncio.sleep((next_p.at - datetime.now()).total_seconds())
+                await asyncio.sleep(next_p.at_ts - unix_time())
                 if not next_p.skip:
                     await self.send(next_p.message)
-                self.timeline.remove(next_p)
-                self.add(next_p.schedule)
+                self.pop()
 
     async def init(self):
         """可重写的初始化函数, 返回 False 将视为初始化错误."""
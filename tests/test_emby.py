@@ -0,0 +1,147 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from curl_cffi.requests.utils import update_url_params
+
+from embykeeper.emby.api import Emby, EmbyConnectError, EmbyStatusError, _PooledSession
+from embykeeper.schema import EmbyAccount
+
+
+class StubSession:
+    def __init__(self, *status_codes: int, content: bytes = b""):
+        self.status_codes = list(status_codes)
+        self.content = content
+        self.calls = 0
+
+    async def request(self, method, url, **kw):
+        self.calls += 1
+        code = self.status_codes.pop(0)
+        return SimpleNamespace(status_code=code, ok=200 <= code < 400, content=self.content)
+
+
+@pytest.fixture()
+def emby(monkeypatch: pytest.MonkeyPatch):
+    emby = Emby(EmbyAccount(url="http://h.example:8096", username="u", password="p", use_proxy=False))
+    emby.logins = 0
+
+    async def login():
+        emby.logins += 1
+        return True
+
+    monkeypatch.setattr(emby, "build_headers", lambda: {})
+    monkeypatch.setattr(emby, "_backoff", lambda attempt: 0)
+    monkeypatch.setattr(emby, "login", login)
+    return emby
+
+
+def use_session(emby: Emby, session: StubSession):
+    @asynccontextmanager
+    async def _use_session():
+        yield session
+
+    emby._use_session = _use_session
+
+
+def test_request_retries_unavailable(emby: Emby):
+    session = StubSession(503, 503, 503)
+    use_session(emby, session)
+    with pytest.raises(EmbyConnectError):
+        asyncio.run(emby._request("GET", "/System/Info"))
+    assert session.calls == 3
+    assert emby.logins == 0
+
+
+def test_request_relogin_once(emby: Emby):
+    session = StubSession(401, 200)
+    use_session(emby, session)
+    resp = asyncio.run(emby._request("GET", "/System/Info"))
+    assert resp.status_code == 200
+    assert session.calls == 2
+    assert emby.logins == 1
+
+
+def test_request_relogin_unauthorized(emby: Emby):
+    session = StubSession(401, 401)
+    use_session(emby, session)
+    with pytest.raises(EmbyStatusError):
+        asyncio.run(emby._request("GET", "/System/Info"))
+    assert session.calls == 2
+    assert emby.logins == 1
+
+
+def test_request_error_body_truncated(emby: Emby):
+    session = StubSession(500, content=b"<html>" + b"x" * 1024)
+    use_session(emby, session)
+    with pytest.raises(EmbyStatusError) as e:
+        asyncio.run(emby._request("GET", "/System/Info"))
+    assert repr(b"<html>" + b"x" * 250) in str(e.value)
+    assert repr(b"x" * 251) not in str(e.value)
+
+
+def test_resp_to_items():
+    resp = SimpleNamespace(status_code=200, content=b'{"Items": [{"Id": "1"}, {"Id": "2"}, {"Id": "3"}]}')
+    assert Emby.resp_to_items(resp, limit=2) == [{"Id": "1"}, {"Id": "2"}]
+    resp = SimpleNamespace(status_code=200, content=b'[{"Id": "1"}, {"Id": "2"}]')
+    assert Emby.resp_to_items(resp, prefix="item") == [{"Id": "1"}, {"Id": "2"}]
+
+
+def test_pooled_session_reuse_and_idle_close():
+    async def main():
+        pooled = _PooledSession(timeout=0.05)
+        session = await pooled.acquire()
+        assert await pooled.acquire() is session
+        pooled.release()
+        await asyncio.sleep(0.1)
+        assert pooled.session is session and not session._closed
+        pooled.release()
+        await asyncio.sleep(0.1)
+        assert pooled.session is None and pooled.reaper is None
+        assert session._closed
+        assert await pooled.acquire() is not session
+        pooled.release()
+        await asyncio.sleep(0.1)
+        assert pooled.session is None
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_pooled_session_close_on_cancel(started: bool):
+    async def main():
+        pooled = _PooledSession(timeout=60)
+        session = await pooled.acquire()
+        pooled.release()
+        if started:
+            await asyncio.sleep(0)
+        reaper = pooled.reaper
+        reaper.cancel()
+        await asyncio.gather(reaper, return_exceptions=True)
+        await pooled.closing
+        assert pooled.session is None and pooled.reaper is None
+        assert session._closed
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("/Items", {"Recursive": True, "IsPlayed": False}),
+        ("/Items", {"Fields": ["Path", "Overview"], "Filters": {"a": 1}}),
+        ("/Items", {"Fields": "Path,Overview", "Limit": 10}),
+        ("/x?y=1", {"y": 2, "z": True}),
+        ("/x?y=1&y=2", {"y": 3}),
+        ("/x?y=", {"y": ["a", "b"]}),
+    ],
+)
+def test_build_url_matches_curl_cffi(emby: Emby, path: str, params: dict):
+    url = emby._build_url(path)
+    assert emby._build_url(path, params) == update_url_params(url, params)
+
+
+def test_build_url_skips_none(emby: Emby):
+    assert (
+        emby._build_url("/Items", {"ParentId": None, "Limit": 10}) == "http://h.example:8096/Items?Limit=10"
+    )
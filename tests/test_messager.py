@@ -0,0 +1,72 @@
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from embykeeper.telegram.messager._base import Messager, _MessageSchedule
+
+
+@pytest.fixture()
+def messager():
+    return Messager(SimpleNamespace(), me=SimpleNamespace(full_name="test"), config={"min_interval": 1})
+
+
+def next_weekday(weekday: int) -> date:
+    day = date.today() + timedelta(days=1)
+    while day.weekday() != weekday:
+        day += timedelta(days=1)
+    return day
+
+
+def test_add_keeps_only_future_plans(messager: Messager):
+    schedule = _MessageSchedule(messages=["a"], at=("0:00", "23:59"), multiply=100)
+    now = datetime.now()
+    messager.add(schedule, use_multiply=True)
+    assert all(p.at >= now for _, _, p in messager.timeline)
+    assert all(p.at.date() == now.date() for _, _, p in messager.timeline)
+
+    tomorrow = now.date() + timedelta(days=1)
+    messager.add(schedule, use_multiply=True, day=tomorrow)
+    assert sum(1 for _, _, p in messager.timeline if p.at.date() == tomorrow) == 100
+
+
+def test_pop_keeps_timelines_consistent(messager: Messager):
+    day = date.today() + timedelta(days=1)
+    messager.add(
+        _MessageSchedule(messages=["a", "b"], multiply=40, possibility=0.5), use_multiply=True, day=day
+    )
+    messager.add(_MessageSchedule(messages=["c"], multiply=10), use_multiply=True, day=day)
+
+    last_ts = 0
+    while messager.timeline:
+        assert sorted(messager._valid_timeline) == sorted(e for e in messager.timeline if not e[2].skip)
+        valid_head = messager._valid_timeline[0][2] if messager._valid_timeline else None
+        plan = messager.pop()
+        assert plan.at_ts >= last_ts
+        last_ts = plan.at_ts
+        if not plan.skip:
+            assert plan is valid_head
+    assert not messager._valid_timeline
+
+
+def test_window_across_midnight(messager: Messager):
+    day = date.today() + timedelta(days=1)
+    messager.add(
+        _MessageSchedule(messages=["a"], at=("22:00", "2:00"), multiply=50), use_multiply=True, day=day
+    )
+    start = datetime.combine(day, time(22, 0))
+    end = datetime.combine(day + timedelta(days=1), time(2, 0))
+    assert len(messager.timeline) == 50
+    assert all(start <= p.at <= end for _, _, p in messager.timeline)
+    assert {p.at.date() for _, _, p in messager.timeline} == {day, day + timedelta(days=1)}
+
+
+def test_only_uses_planned_day(messager: Messager):
+    saturday = next_weekday(5)
+    messager.add(
+        _MessageSchedule(messages=["a"], multiply=5, only="weekday"), use_multiply=True, day=saturday
+    )
+    messager.add(
+        _MessageSchedule(messages=["b"], multiply=5, only="weekend"), use_multiply=True, day=saturday
+    )
+    assert all(p.skip == (p.message == "a") for _, _, p in messager.timeline)